@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+
+import argparse
+import collections
+import json
+import pathlib
+import sys
+from typing import Iterator, Optional, TextIO
+
+# Read size for the streaming JSON reader. Only one chunk plus the entry
+# currently being decoded is held in memory at any time.
+CHUNK_SIZE = 64 * 1024
+
+# reccmp uses this in place of a recomp address when it differs between samples.
+RECOMP_VARIOUS = "various"
+
+# Entity type for functions in reccmp reports. Older reports have no type.
+ENTITY_TYPE_FUNCTION = 1
+
+WHITESPACE = " \t\r\n"
+
+NUMBER_START = "-0123456789"
+NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JsonStream:
+    """Minimal pull parser for the reccmp report layout: a top-level object
+    whose values are decoded one at a time, including the individual elements
+    of the (potentially very large) `data` array."""
+
+    def __init__(self, f: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected '{char}' at offset {self._pos}")
+        self._pos += 1
+
+    def _buffer_number(self):
+        """Make sure the number at the current position is followed by another
+        character or EOF. A number cut off by the end of the buffer would
+        otherwise decode as a valid but truncated value, e.g. `1` of `1.5`."""
+        while True:
+            end = self._pos
+            while end < len(self._buf) and self._buf[end] in NUMBER_CHARS:
+                end += 1
+            if end < len(self._buf) or not self._fill():
+                return
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        if self.peek() in NUMBER_START:
+            self._buffer_number()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Iterate over the keys of an object. The caller must consume each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def elements(self) -> Iterator:
+        """Iterate over the elements of an array."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def iter_report(path: pathlib.Path) -> Iterator[tuple[str, object]]:
+    """Stream a reccmp JSON report. Yields ("entity", dict) for each element of
+    `data` and (key, value) for every other top-level field."""
+    with path.open("r", encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.members():
+            if key == "data":
+                for entity in stream.elements():
+                    yield ("entity", entity)
+            else:
+                yield (key, stream.value())
+
+
+def accuracy_sort_key(entity: dict) -> float:
+    """Same ranking as reccmp-aggregate: a 100% match is preferred over an
+    effective match, which is preferred over any accuracy. Stubs rank last."""
+    if entity.get("stub"):
+        return -1.0
+    if entity["matching"] == 1.0 and not entity.get("effective"):
+        return 1000.0
+    if entity.get("effective"):
+        return 1.0
+    return entity["matching"]
+
+
+def is_function(entity: dict) -> bool:
+    return entity.get("type") in (None, ENTITY_TYPE_FUNCTION)
+
+
+class FunctionStats:
+    """Running aggregate for one original address."""
+
+    __slots__ = ("rank", "entity", "best_sample", "recomp")
+
+    def __init__(self, entity: dict, sample: int):
+        self.rank = accuracy_sort_key(entity)
+        self.entity = entity
+        self.best_sample = sample
+        self.recomp = entity.get("recomp")
+
+    def fold(self, entity: dict, sample: int):
+        # Keep the recomp address only if it is the same across all samples.
+        if self.recomp != entity.get("recomp"):
+            self.recomp = RECOMP_VARIOUS
+
+        rank = accuracy_sort_key(entity)
+        if rank > self.rank:
+            self.rank = rank
+            self.entity = entity
+            self.best_sample = sample
+
+    def to_json(self) -> dict:
+        out = {
+            key: value
+            for key, value in self.entity.items()
+            if value is not None and value is not False
+        }
+        if self.recomp:
+            out["recomp"] = self.recomp
+        return out
+
+
+class Aggregator:
+    """Folds sample reports into a per-address aggregate one file at a time.
+    Memory use depends on the number of functions, not the number of samples."""
+
+    def __init__(self):
+        self.filename: Optional[str] = None
+        self.samples: list[str] = []
+        self.functions: dict[int, FunctionStats] = {}
+        self.function_count = 0
+
+    def add_sample(self, path: pathlib.Path):
+        """Fold one report into the aggregate. The report is read completely
+        before anything is merged, so a broken or truncated file raises
+        ValueError and leaves the aggregate unchanged."""
+        staged: dict[int, dict] = {}
+        filename = None
+        function_count = 0
+        try:
+            for key, value in iter_report(path):
+                if key == "entity":
+                    # The diff is only useful for the HTML report and can be large.
+                    value.pop("diff", None)
+                    # Check the fields used for ranking before anything is merged.
+                    accuracy_sort_key(value)
+                    staged[int(value["address"], 16)] = value
+                elif key == "file":
+                    filename = value
+                elif key == "function_count" and value:
+                    function_count = value
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"invalid entity: {e!r}") from e
+
+        if filename is None:
+            raise ValueError("no source file name")
+        if self.filename is not None and self.filename.lower() != filename.lower():
+            raise ValueError(f"'{path}' was created from {filename}, expected {self.filename}")
+
+        sample = len(self.samples)
+        for addr, entity in staged.items():
+            stats = self.functions.get(addr)
+            if stats is None:
+                self.functions[addr] = FunctionStats(entity, sample)
+            else:
+                stats.fold(entity, sample)
+
+        self.filename = filename
+        self.function_count = max(self.function_count, function_count)
+        self.samples.append(str(path))
+
+    def best(self, addr: int) -> float:
+        entity = self.functions[addr].entity
+        return 1.0 if entity.get("effective") else entity["matching"]
+
+    def contributions(self) -> collections.Counter:
+        """Number of functions for which each sample holds the best score.
+        Ties go to the sample folded first."""
+        return collections.Counter(
+            self.samples[stats.best_sample] for stats in self.functions.values()
+        )
+
+    def write(self, f: TextIO, timestamp: float):
+        """Write the aggregate in the reccmp report format so that it can be
+        passed to `reccmp-aggregate --diff` or folded in again as a sample."""
+        function_count = sum(1 for s in self.functions.values() if is_function(s.entity))
+        f.write(f'{{"file": {json.dumps(self.filename)}, "format": 1, "timestamp": {timestamp}, "data": [')
+        for i, addr in enumerate(sorted(self.functions)):
+            if i:
+                f.write(", ")
+            f.write(json.dumps(self.functions[addr].to_json()))
+        f.write(f'], "function_count": {max(function_count, self.function_count)}}}')
+
+
+def diff_aggregate(agg: Aggregator, old_path: pathlib.Path) -> tuple[list, list, list, list]:
+    """Stream a previous aggregate and compare it against the current one.
+    Returns the lists of (addr, name, old, new) improvements and regressions,
+    the list of (addr, name, new) functions that were not in the previous
+    aggregate and the list of (addr, name) functions that are no longer present."""
+    improved = []
+    regressed = []
+    missing = []
+    seen = set()
+
+    for key, value in iter_report(old_path):
+        if key != "entity":
+            continue
+        addr = int(value["address"], 16)
+        seen.add(addr)
+        old = 1.0 if value.get("effective") else value["matching"]
+        if addr not in agg.functions:
+            missing.append((addr, value["name"]))
+            continue
+        new = agg.best(addr)
+        if new > old:
+            improved.append((addr, value["name"], old, new))
+        elif new < old:
+            regressed.append((addr, value["name"], old, new))
+
+    new_functions = [
+        (addr, agg.functions[addr].entity["name"], agg.best(addr))
+        for addr in sorted(agg.functions)
+        if addr not in seen
+    ]
+
+    return (improved, regressed, new_functions, missing)
+
+
+def print_diff(improved: list, regressed: list, new_functions: list, missing: list):
+    for title, rows in (("Improved", improved), ("Regressed", regressed)):
+        if rows:
+            print(f"{title}: {len(rows)}")
+            for addr, name, old, new in sorted(rows):
+                print(f"  0x{addr:08x} {name}: {old:.2%} -> {new:.2%}")
+    if new_functions:
+        print(f"New: {len(new_functions)}")
+        for addr, name, new in new_functions:
+            print(f"  0x{addr:08x} {name}: {new:.2%}")
+    if missing:
+        print(f"No longer present: {len(missing)}")
+        for addr, name in sorted(missing):
+            print(f"  0x{addr:08x} {name}")
+    if not (improved or regressed or new_functions or missing):
+        print("No change in accuracy")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False,
+        description="Incrementally aggregate reccmp accuracy samples (e.g. LEGO1PROGRESS*.json)",
+        fromfile_prefix_chars="@",
+    )
+    parser.add_argument(
+        "--samples",
+        type=pathlib.Path,
+        nargs="+",
+        required=True,
+        help="Report files to aggregate. A previous aggregate can be passed as a sample to continue from it",
+    )
+    parser.add_argument("--output", "-o", type=pathlib.Path, help="Where to save the aggregate file")
+    parser.add_argument("--diff", type=pathlib.Path, help="Previous aggregate to compare against")
+    parser.add_argument(
+        "--contributions",
+        type=int,
+        metavar="N",
+        default=0,
+        help="Show the N samples that provide the best match for the most functions",
+    )
+    args = parser.parse_args()
+
+    agg = Aggregator()
+    timestamp = 0.0
+    skipped = 0
+    for path in args.samples:
+        if not path.is_file():
+            print(f"File not found: '{path}'", file=sys.stderr)
+            skipped += 1
+            continue
+        try:
+            agg.add_sample(path)
+        except ValueError as e:
+            print(f"Skipping '{path}': {e}", file=sys.stderr)
+            skipped += 1
+            continue
+        timestamp = max(timestamp, path.stat().st_mtime)
+
+    if not agg.samples:
+        parser.error("No samples could be read")
+
+    total = len(agg.functions)
+    exact = sum(1 for addr in agg.functions if agg.best(addr) == 1.0)
+    print(f"Aggregated {len(agg.samples)} samples of {agg.filename}: {exact}/{total} functions match")
+
+    if args.contributions:
+        print("Best match contributions:")
+        for sample, count in agg.contributions().most_common(args.contributions):
+            print(f"  {count:6d} {sample}")
+
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as f:
+            agg.write(f, timestamp)
+
+    if args.diff:
+        if args.diff.is_file() and args.diff.stat().st_size > 0:
+            print_diff(*diff_aggregate(agg, args.diff))
+        else:
+            print(f"Previous aggregate '{args.diff}' not found")
+
+    if skipped:
+        print(f"{skipped} samples could not be read", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
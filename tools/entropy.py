@@ -1,6 +1,8 @@
+import argparse
+import pathlib
 import random
+import re
 import string
-import sys
 
 # Parameters for tweaking:
 MAX_CLASSES = 10
@@ -10,36 +12,149 @@
 CLASS_NAME_LEN = 6
 FUNC_NAME_LEN = 8
 
+CMAKELISTS = pathlib.Path(__file__).parent.parent / "CMakeLists.txt"
 
-def random_camel_case(length: int) -> str:
+# Matches the compiled targets in CMakeLists.txt, e.g. `add_library(omni${ARG_SUFFIX} STATIC ...)`
+CMAKE_TARGET_RE = re.compile(r"add_(?:library|executable)\(([\w${}]+)\s+(?:STATIC|SHARED|WIN32)\s([^)]*)\)")
+
+
+def random_camel_case(rng: random.Random, length: int) -> str:
     """Return a random string with first letter capitalized."""
     return "".join(
         [
-            random.choice(string.ascii_uppercase),
-            *random.choices(string.ascii_lowercase, k=length - 1),
+            rng.choice(string.ascii_uppercase),
+            *rng.choices(string.ascii_lowercase, k=length - 1),
         ]
     )
 
 
-# If the first parameter is an integer, use it as the seed.
-try:
-    seed = int(sys.argv[1])
-except (IndexError, ValueError):
-    seed = random.randint(0, 10000)
+def generate(rng: random.Random, label: str) -> str:
+    """Return the contents of an entropy header: a random number of classes
+    with a random number of empty inline functions each."""
+    lines = [f"// Seed: {label}\n"]
+
+    num_classes = rng.randint(1, MAX_CLASSES)
+    for i in range(num_classes):
+        class_name = "Class" + random_camel_case(rng, CLASS_NAME_LEN)
+        lines.append(f"class {class_name} {{")
+        num_functions = rng.randint(1, MAX_FUNC_PER_CLASS)
+        for j in range(num_functions):
+            function_name = "Function" + random_camel_case(rng, FUNC_NAME_LEN)
+            lines.append(f"\tinline void {function_name}() {{}}")
+
+        lines.append("};\n")
+
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def read_cmake_targets(cmakelists: pathlib.Path) -> dict[str, tuple[str, list[str]]]:
+    """Return {cmake target: (module, translation units)} for the targets
+    that are force-included with an entropy header."""
+    targets = {}
+    for match in CMAKE_TARGET_RE.finditer(cmakelists.read_text()):
+        name, sources = match.groups()
+        sources = [source for source in sources.split() if source.endswith(".cpp")]
+        if name == "${NAME}":
+            targets["lego1"] = ("LEGO1", sources)
+        elif name.endswith("${ARG_SUFFIX}"):
+            targets[name.replace("${ARG_SUFFIX}", "")] = ("LEGO1", sources)
+        else:
+            targets[name] = (name.upper(), sources)
+    return targets
+
+
+def write_headers(args: argparse.Namespace, seed: int, targets: dict[str, tuple[str, list[str]]]) -> int:
+    """Write one `entropy_<target>.h` per CMake target. Files are only touched
+    if their contents change so that unaffected object files are reused."""
+    vary = {name.lower() for name in args.vary} if args.vary else None
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    changed_sources = set()
+    for name, (module, sources) in targets.items():
+        # Each header gets its own sub-seed so that it does not depend on which
+        # other headers are generated.
+        key = module
+        if args.libraries and name != module.lower():
+            key = f"{module}/{name}"
+
+        varies = vary is None or name in vary or module.lower() in vary
+        target_seed = seed if varies else args.base_seed
+        contents = generate(random.Random(f"{target_seed}/{key}"), f"{target_seed} ({key})")
+
+        path = args.output_dir / f"entropy_{name}.h"
+        changed = not path.is_file() or path.read_text() != contents
+        if changed:
+            path.write_text(contents)
+
+        if changed:
+            changed_sources.update(sources)
+        status = "changed" if changed else "unchanged"
+        print(f"{path.name:<28} {status:<10} {len(sources):4d} translation units")
+
+    # A source compiled into several targets (e.g. mxdirectx in CONFIG) depends
+    # on the headers of all of them, see OBJECT_DEPENDS in CMakeLists.txt.
+    objects = [source for _, sources in targets.values() for source in sources]
+    invalidated = sum(1 for source in objects if source in changed_sources)
+    print(f"Invalidated {invalidated} of {len(objects)} translation units")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False,
+        description="Generate entropy headers with random classes to vary the code layout of the recompiled binaries",
+    )
+    parser.add_argument("seed", nargs="?", help="Integer seed. A random seed is used if omitted")
+    parser.add_argument(
+        "--output-dir",
+        type=pathlib.Path,
+        help="Write one header per CMake target to this directory (for ISLE_ENTROPY_DIR) "
+        "instead of a single header to stdout",
+    )
+    parser.add_argument(
+        "--libraries",
+        action="store_true",
+        help="Use an independent sub-seed for each static library of LEGO1 instead of one for the whole module",
+    )
+    parser.add_argument(
+        "--vary",
+        nargs="+",
+        metavar="TARGET",
+        help="Only use the seed for these modules (e.g. LEGO1), or libraries with --libraries (e.g. omni). "
+        "The others use --base-seed",
+    )
+    parser.add_argument("--base-seed", type=int, default=0, help="Seed for targets not listed in --vary")
+    parser.add_argument("--cmakelists", type=pathlib.Path, default=CMAKELISTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
 
-random.seed(seed)
+    # If the first parameter is an integer, use it as the seed.
+    try:
+        seed = int(args.seed)
+    except (TypeError, ValueError):
+        seed = random.randint(0, 10000)
 
-print(f"// Seed: {seed}\n")
+    if args.output_dir:
+        targets = read_cmake_targets(args.cmakelists)
+        if args.vary:
+            # A typo would silently give every target the base seed
+            modules = {module.lower() for module, _ in targets.values()}
+            names = set(targets) | modules
+            unknown = [name for name in args.vary if name.lower() not in names]
+            if unknown:
+                parser.error(
+                    f"Unknown --vary targets: {', '.join(unknown)} (expected one of {', '.join(sorted(names))})"
+                )
+            # Without --libraries, the libraries of a module share its sub-seed
+            libraries = [name for name in args.vary if name.lower() not in modules]
+            if libraries and not args.libraries:
+                parser.error(f"--vary {', '.join(libraries)} requires --libraries")
+        return write_headers(args, seed, targets)
 
-num_classes = random.randint(1, MAX_CLASSES)
-for i in range(num_classes):
-    class_name = "Class" + random_camel_case(CLASS_NAME_LEN)
-    print(f"class {class_name} {{")
-    num_functions = random.randint(1, MAX_FUNC_PER_CLASS)
-    for j in range(num_functions):
-        function_name = "Function" + random_camel_case(FUNC_NAME_LEN)
-        print(f"\tinline void {function_name}() {{}}")
+    print(generate(random.Random(seed), str(seed)), end="")
+    return 0
 
-    print(f"}};\n")
 
-print()
+if __name__ == "__main__":
+    raise SystemExit(main())
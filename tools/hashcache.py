@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import pathlib
+from typing import Optional
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_CACHE_PATH = (
+    pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home() / ".cache"))
+    / "isle"
+    / "hashes.json"
+)
+
+
+def hash_file(path: pathlib.Path, algorithm: str) -> str:
+    h = hashlib.new(algorithm)
+    with path.open("rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat_key(st: os.stat_result) -> list:
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class HashCache:
+    """Digests keyed by absolute path, only valid while size, mtime and inode
+    of the file are unchanged. Pass `None` as the path to disable the cache."""
+
+    def __init__(self, path: Optional[pathlib.Path] = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        self._dirty = False
+
+        if path is not None and path.is_file():
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                if isinstance(entries, dict):
+                    self._entries = entries
+            except (OSError, ValueError):
+                # A broken cache only costs us a rehash.
+                pass
+
+    @staticmethod
+    def _key(path: pathlib.Path) -> str:
+        return str(path.resolve())
+
+    def lookup(self, path: pathlib.Path, algorithm: str) -> Optional[str]:
+        entry = self._entries.get(self._key(path))
+        if entry is None or entry["stat"] != _stat_key(path.stat()):
+            return None
+        return entry["digests"].get(algorithm)
+
+    def store(self, path: pathlib.Path, algorithm: str, digest: str, st: os.stat_result):
+        """Record a digest computed from the file as it was when `st` was taken."""
+        key = self._key(path)
+        entry = self._entries.get(key)
+        if entry is None or entry["stat"] != _stat_key(st):
+            entry = {"stat": _stat_key(st), "digests": {}}
+            self._entries[key] = entry
+        entry["digests"][algorithm] = digest
+        self._dirty = True
+
+    def forget(self, path: pathlib.Path):
+        if self._entries.pop(self._key(path), None) is not None:
+            self._dirty = True
+
+    def digest(self, path: pathlib.Path, algorithm: str) -> str:
+        digest = self.lookup(path, algorithm)
+        if digest is None:
+            st = path.stat()
+            digest = hash_file(path, algorithm)
+            self.store(path, algorithm, digest, st)
+        return digest
+
+    def save(self):
+        if self.path is None or not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        tmp.replace(self.path)
+        self._dirty = False
@@ -30,6 +30,7 @@
 import difflib
 import os
 import fnmatch
+import hashlib
 from clang.cindex import Index
 from clang.cindex import CursorKind
 from clang.cindex import StorageClass
@@ -54,11 +55,17 @@ def __init__(self, name, clang_kind, parent_kind=None, pattern_str='^.*$'):
         self.includes = []
         self.excludes = []
 
-    def evaluate(self, node, scope=None):
+    def check(self, node, scope=None):
+        """ Returns the violation message, or None if the node matches the rule """
         if not self.pattern.match(node.spelling):
             fmt = '{}:{}:{}: "{}" does not match "{}" associated with {}\n'
-            msg = fmt.format(node.location.file.name, node.location.line, node.location.column,
-                             node.displayname, self.pattern_str, self.name)
+            return fmt.format(node.location.file.name, node.location.line, node.location.column,
+                              node.displayname, self.pattern_str, self.name)
+        return None
+
+    def evaluate(self, node, scope=None):
+        msg = self.check(node, scope)
+        if msg:
             sys.stderr.write(msg)
             return False
         return True
@@ -175,7 +182,8 @@ def get_datatype_prefix(self, node):
                 return self.datatype_prefix_rule.bool_prefix
         return ""
 
-    def evaluate(self, node, scope=None):
+    def check(self, node, scope=None):
+        """ Returns the violation message, or None if the node matches the rule """
         pattern_str = self.pattern_str
         scope_prefix = self.get_scope_prefix(node, scope)
         datatype_prefix = self.get_datatype_prefix(node)
@@ -185,11 +193,16 @@ def evaluate(self, node, scope=None):
         pattern = re.compile(pattern_str)
         if not pattern.match(node.spelling):
             fmt = '{}:{}:{}: "{}" does not have the pattern {} associated with Variable name\n'
-            msg = fmt.format(node.location.file.name, node.location.line, node.location.column,
-                             node.displayname, pattern_str)
+            return fmt.format(node.location.file.name, node.location.line, node.location.column,
+                              node.displayname, pattern_str)
+
+        return None
+
+    def evaluate(self, node, scope=None):
+        msg = self.check(node, scope)
+        if msg:
             sys.stderr.write(msg)
             return False
-
         return True
 
 
@@ -368,6 +381,7 @@ def __init__(self):
         self._style_file = None
         self.file_exclusions = None
         self._skip_file = None
+        self._baseline_file = None
 
         self.parser = argparse.ArgumentParser(
             prog="ncc.py",
@@ -413,6 +427,14 @@ def __init__(self):
                                  "User can use the skip file to specify character sequences that should "
                                  "be ignored by ncc")
 
+        self.parser.add_argument('--baseline', dest="baseline_file",
+                                 help="Only report violations that are not listed in the baseline file. "
+                                 "Baseline entries that no longer match a violation are reported as stale")
+
+        self.parser.add_argument('--update-baseline', dest="update_baseline", action='store_true',
+                                 help="Record the current violations of the checked files in the baseline file "
+                                 "instead of reporting them. Entries of other files are kept")
+
         # self.parser.add_argument('--exclude-dir', dest='exclude_dir', help="Skip the directories"
         #                          "matching the pattern specified")
 
@@ -436,6 +458,15 @@ def parse_cmd_line(self):
             if not os.path.exists(self._skip_file):
                 sys.stderr.write("Skip file '{}' not found!\n".format(self._skip_file))
 
+        if self.args.baseline_file:
+            self._baseline_file = self.args.baseline_file
+            if not self.args.update_baseline and not os.path.exists(self._baseline_file):
+                sys.stderr.write("Baseline file '{}' not found!\n".format(self._baseline_file))
+                sys.exit(1)
+        elif self.args.update_baseline:
+            sys.stderr.write("--update-baseline requires --baseline\n")
+            sys.exit(1)
+
     def dump_all_rules(self):
         print("----------------------------------------------------------")
         print("{:<35} | {}".format("Rule Name", "Pattern"))
@@ -462,6 +493,78 @@ def check_skip_db(self, input_query):
         else:
             return 0
 
+
+class BaselineDb(object):
+    """
+    Known violations identified by a fingerprint of file, rule, enclosing scope and name.
+    The line number is not part of the fingerprint, so unrelated edits do not invalidate
+    the baseline. File names are relative to the directory of the baseline file. Each
+    line of the file is a hash of the fingerprint followed by its tab-separated fields.
+    Lines are sorted by hash.
+    """
+    header = "# ncc baseline v1"
+
+    def __init__(self, baseline_file=None, record=False):
+        self.__baseline_db = {}
+        self.__seen = set()
+        self.__record = record
+        self.__root = os.path.dirname(os.path.abspath(baseline_file)) if baseline_file else os.getcwd()
+
+        # When recording, the entries of files that are not validated are kept
+        if baseline_file and os.path.exists(baseline_file):
+            self.build_baseline_db(baseline_file)
+
+    def relpath(self, filename):
+        return os.path.relpath(os.path.abspath(filename), self.__root).replace(os.sep, '/')
+
+    def fingerprint(self, filename, rule_name, node):
+        """ Returns (hash, fields) for a violation of rule_name by node in filename """
+        scope = []
+        parent = node.semantic_parent
+        while parent is not None and parent.kind != CursorKind.TRANSLATION_UNIT:
+            scope.append(parent.spelling)
+            parent = parent.semantic_parent
+        fields = (self.relpath(filename), rule_name, '::'.join(reversed(scope)), node.displayname)
+        digest = hashlib.blake2b('\0'.join(fields).encode(), digest_size=8).hexdigest()
+        return digest, fields
+
+    def build_baseline_db(self, baseline_file):
+        with open(baseline_file) as f:
+            for line in f:
+                if line.startswith('#'):
+                    continue
+                digest, _, fields = line.rstrip('\n').partition('\t')
+                self.__baseline_db[digest] = fields
+
+    def check_baseline_db(self, fingerprint):
+        digest, fields = fingerprint
+        if self.__record:
+            self.__baseline_db[digest] = '\t'.join(fields)
+        elif digest not in self.__baseline_db:
+            return 0
+        self.__seen.add(digest)
+        return 1
+
+    def stale_entries(self, filenames):
+        """ Baseline entries for the given files that did not match a violation """
+        filenames = {self.relpath(f) for f in filenames}
+        return sorted(fields for (digest, fields) in self.__baseline_db.items()
+                      if digest not in self.__seen and fields.split('\t', 1)[0] in filenames)
+
+    def write_baseline_db(self, baseline_file, filenames=()):
+        """ Writes the baseline, dropping the stale entries of the given files """
+        stale = set(self.stale_entries(filenames))
+        with open(baseline_file, 'w') as f:
+            f.write(self.header + '\n')
+            for digest in sorted(self.__baseline_db):
+                if self.__baseline_db[digest] not in stale:
+                    f.write('{}\t{}\n'.format(digest, self.__baseline_db[digest]))
+        return len(self.__baseline_db) - len(stale)
+
+    def __len__(self):
+        return len(self.__baseline_db)
+
+
 class RulesDb(object):
     def __init__(self, style_file=None):
         self.__rule_db = {}
@@ -520,10 +623,11 @@ def get_rule(self, rule_name):
 
 
 class Validator(object):
-    def __init__(self, rule_db, filename, options, skip_db=None):
+    def __init__(self, rule_db, filename, options, skip_db=None, baseline_db=None):
         self.filename = filename
         self.rule_db = rule_db
         self.skip_db = skip_db
+        self.baseline_db = baseline_db
         self.options = options
         self.node_stack = AstNodeStack()
 
@@ -586,9 +690,17 @@ def evaluate(self, node):
 
         rule_name = self.rule_db.get_rule_names(node.kind)
         rule = self.rule_db.get_rule(rule_name)
-        if rule.evaluate(node, self.node_stack.peek()) is False:
-            return 1
-        return 0
+        msg = rule.check(node, self.node_stack.peek())
+        if msg is None:
+            return 0
+
+        # Known violations recorded in the baseline are not reported
+        if self.baseline_db is not None and self.baseline_db.check_baseline_db(
+                self.baseline_db.fingerprint(self.filename, rule_name, node)):
+            return 0
+
+        sys.stderr.write(msg)
+        return 1
 
     def is_local(self, node, filename):
         """ Returns True is node belongs to the file being validated and not an include file """
@@ -635,20 +747,28 @@ def do_validate(options, filename):
     """ Creating the skip database """
     skip_db = SkipDb(op._skip_file)
 
+    """ Creating the baseline database """
+    baseline_db = None
+    if op._baseline_file:
+        baseline_db = BaselineDb(op._baseline_file, op.args.update_baseline)
+
     """ Check the source code against the configured rules """
     errors = 0
+    validated = []
     for path in op.args.path:
         if os.path.isfile(path):
             if do_validate(op, path):
-                v = Validator(rules_db, path, op, skip_db)
+                v = Validator(rules_db, path, op, skip_db, baseline_db)
                 errors += v.validate()
+                validated.append(path)
         elif os.path.isdir(path):
             for (root, subdirs, files) in os.walk(path):
                 for filename in files:
                     path = root + '/' + filename
                     if do_validate(op, path):
-                        v = Validator(rules_db, path, op, skip_db)
+                        v = Validator(rules_db, path, op, skip_db, baseline_db)
                         errors += v.validate()
+                        validated.append(path)
 
                 if not op.args.recurse:
                     break
@@ -656,6 +776,16 @@ def do_validate(options, filename):
             sys.stderr.write("File '{}' not found!\n".format(path))
             sys.exit(1)
 
+    if op.args.update_baseline:
+        count = baseline_db.write_baseline_db(op._baseline_file, validated)
+        print("Wrote {} entries to baseline '{}'".format(count, op._baseline_file))
+    elif baseline_db is not None:
+        stale = baseline_db.stale_entries(validated)
+        for fields in stale:
+            sys.stderr.write("Stale baseline entry: {}\n".format(' '.join(fields.split('\t'))))
+        if stale:
+            print("Total number of stale baseline entries = {}".format(len(stale)))
+
     if errors:
         print("Total number of errors = {}".format(errors))
         sys.exit(1)
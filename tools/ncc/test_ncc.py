@@ -0,0 +1,140 @@
+import types
+
+import pytest
+
+pytest.importorskip("clang.cindex")
+
+from clang.cindex import CursorKind  # noqa: E402
+
+import ncc  # noqa: E402
+
+
+class FakeNode:
+    def __init__(self, spelling, kind, parent=None):
+        self.spelling = spelling
+        self.displayname = spelling
+        self.kind = kind
+        self.semantic_parent = parent
+        self.location = types.SimpleNamespace(
+            file=types.SimpleNamespace(name="LEGO1/test.cpp"), line=1, column=1)
+
+
+class FakeRulesDb:
+    rule = ncc.Rule("CppMethod", CursorKind.CXX_METHOD, pattern_str="^[A-Z]")
+
+    def is_rule_enabled(self, kind):
+        return kind == CursorKind.CXX_METHOD
+
+    def get_rule_names(self, kind):
+        return "CppMethod"
+
+    def get_rule(self, rule_name):
+        return self.rule
+
+
+def make_validator(baseline_db, filename="LEGO1/test.cpp"):
+    # Skip __init__, which parses the file with libclang
+    v = ncc.Validator.__new__(ncc.Validator)
+    v.filename = filename
+    v.rule_db = FakeRulesDb()
+    v.skip_db = ncc.SkipDb()
+    v.baseline_db = baseline_db
+    v.node_stack = ncc.AstNodeStack()
+    return v
+
+
+def violations():
+    tu = FakeNode("LEGO1/test.cpp", CursorKind.TRANSLATION_UNIT)
+    cls = FakeNode("Foo", CursorKind.CLASS_DECL, tu)
+    return [FakeNode("bad_name{}".format(i), CursorKind.CXX_METHOD, cls) for i in range(5)]
+
+
+def run(baseline_db, nodes, filename="LEGO1/test.cpp"):
+    v = make_validator(baseline_db, filename)
+    return sum(v.evaluate(node) for node in nodes)
+
+
+def test_baseline_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    baseline = str(tmp_path / "baseline.txt")
+    nodes = violations()
+
+    assert run(None, nodes) == len(nodes)
+
+    # Record mode starts with an empty db, which must still record violations
+    record_db = ncc.BaselineDb(baseline, record=True)
+    assert run(record_db, nodes) == 0
+    record_db.write_baseline_db(baseline)
+
+    with open(baseline) as f:
+        lines = [line for line in f if not line.startswith("#")]
+    assert len(lines) == len(nodes)
+    assert lines == sorted(lines)
+
+    baseline_db = ncc.BaselineDb(baseline)
+    assert run(baseline_db, nodes) == 0
+    assert baseline_db.stale_entries(["LEGO1/test.cpp"]) == []
+
+
+def test_baseline_reports_new_and_stale(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    baseline = str(tmp_path / "baseline.txt")
+    nodes = violations()
+
+    record_db = ncc.BaselineDb(baseline, record=True)
+    run(record_db, nodes[:3])
+    record_db.write_baseline_db(baseline)
+
+    # Two new violations, one fixed
+    baseline_db = ncc.BaselineDb(baseline)
+    assert run(baseline_db, nodes[1:]) == 2
+    stale = baseline_db.stale_entries(["LEGO1/test.cpp"])
+    assert len(stale) == 1 and stale[0].endswith("bad_name0")
+
+    # Entries for files that were not checked are not stale
+    assert ncc.BaselineDb(baseline).stale_entries(["LEGO1/other.cpp"]) == []
+
+
+def test_empty_baseline_reports_everything(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    baseline = str(tmp_path / "baseline.txt")
+    ncc.BaselineDb(baseline, record=True).write_baseline_db(baseline)
+
+    assert run(ncc.BaselineDb(baseline), violations()) == len(violations())
+
+
+def test_update_keeps_other_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    baseline = str(tmp_path / "baseline.txt")
+    nodes = violations()
+
+    record_db = ncc.BaselineDb(baseline, record=True)
+    run(record_db, nodes[:3])
+    run(record_db, nodes, "LEGO1/other.cpp")
+    assert record_db.write_baseline_db(baseline, ["LEGO1/test.cpp", "LEGO1/other.cpp"]) == 8
+
+    # Updating only test.cpp drops its fixed violation and keeps those of other.cpp
+    record_db = ncc.BaselineDb(baseline, record=True)
+    run(record_db, nodes[1:4])
+    assert record_db.write_baseline_db(baseline, ["LEGO1/test.cpp"]) == 8
+
+    baseline_db = ncc.BaselineDb(baseline)
+    assert run(baseline_db, nodes, "LEGO1/other.cpp") == 0
+    assert run(baseline_db, nodes) == 2
+    assert baseline_db.stale_entries(["LEGO1/test.cpp", "LEGO1/other.cpp"]) == []
+
+
+def test_baseline_independent_of_cwd(tmp_path, monkeypatch):
+    (tmp_path / "tools").mkdir()
+    baseline = str(tmp_path / "baseline.txt")
+    nodes = violations()
+
+    monkeypatch.chdir(tmp_path)
+    record_db = ncc.BaselineDb(baseline, record=True)
+    run(record_db, nodes)
+    record_db.write_baseline_db(baseline, ["LEGO1/test.cpp"])
+
+    monkeypatch.chdir(tmp_path / "tools")
+    baseline_db = ncc.BaselineDb("../baseline.txt")
+    assert run(baseline_db, nodes, "../LEGO1/test.cpp") == 0
+    assert baseline_db.stale_entries(["../LEGO1/test.cpp"]) == []
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+import argparse
+import mmap
+import pathlib
+import shutil
+
+import yaml
+
+from hashcache import DEFAULT_CACHE_PATH, HashCache
+
+DEFAULT_MANIFEST = pathlib.Path(__file__).parent / "patches.yml"
+
+
+class PatchError(Exception):
+    pass
+
+
+class Patch:
+    def __init__(self, offset: int, expected: bytes, replacement: bytes):
+        if len(expected) != len(replacement):
+            raise ValueError(
+                f"Patch at 0x{offset:08x}: expected and replacement differ in length"
+            )
+        self.offset = offset
+        self.expected = expected
+        self.replacement = replacement
+
+    def __len__(self):
+        return len(self.expected)
+
+
+class Target:
+    def __init__(self, name: str, obj: dict):
+        self.name = name
+        self.description = obj.get("description", name)
+        self.size = obj.get("size")
+        self.hashes = {
+            algorithm: {digest.lower() for digest in digests}
+            for algorithm, digests in obj.get("hash", {}).items()
+        }
+        self.patches = [
+            Patch(
+                p["offset"],
+                bytes.fromhex(p["expected"]),
+                bytes.fromhex(p["replacement"]),
+            )
+            for p in obj["patches"]
+        ]
+
+
+def load_manifest(path: pathlib.Path) -> dict[str, Target]:
+    """Return the manifest targets keyed by upper-case file name."""
+    with path.open() as f:
+        manifest = yaml.safe_load(f)
+
+    return {
+        name.upper(): Target(name, obj) for name, obj in manifest["targets"].items()
+    }
+
+
+def pending_patches(mm: mmap.mmap, target: Target) -> list[Patch]:
+    """Return the patches that have not been applied yet.
+    Raise if any location holds neither the expected nor the replacement bytes."""
+    pending = []
+    for patch in target.patches:
+        if patch.offset + len(patch) > len(mm):
+            raise PatchError(f"patch at 0x{patch.offset:08x} is past the end of the file")
+        current = mm[patch.offset : patch.offset + len(patch)]
+        if current == patch.replacement:
+            continue
+        if current != patch.expected:
+            raise PatchError(
+                f"unexpected bytes at 0x{patch.offset:08x}: {current.hex(' ').upper()}"
+            )
+        pending.append(patch)
+    return pending
+
+
+def patch_file(
+    path: pathlib.Path, target: Target, cache: HashCache, force: bool = False
+) -> int:
+    """Apply all patches of the target to the file in place.
+    Returns the number of patches applied; 0 if the file was already patched."""
+
+    def check(ok: bool, msg: str):
+        if ok:
+            return
+        if not force:
+            raise PatchError(msg)
+        print(f"Warning: {msg}")
+
+    size = path.stat().st_size
+    if size == 0:
+        raise PatchError("file is empty")
+    if target.size is not None:
+        check(size == target.size, "file size is not correct")
+    for algorithm, digests in target.hashes.items():
+        check(
+            cache.digest(path, algorithm) in digests,
+            f"{algorithm} checksum does not match",
+        )
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pending = pending_patches(mm, target)
+
+    if not pending:
+        return 0
+
+    backup = path.with_name(path.name + ".BAK")
+    if not backup.exists():
+        print(f'Creating backup "{backup}"')
+        shutil.copyfile(path, backup)
+
+    # Only the pages holding patched bytes are written back.
+    with path.open("r+b") as f, mmap.mmap(f.fileno(), 0) as mm:
+        for patch in pending:
+            print(f"Patching {len(patch)} bytes at 0x{patch.offset:08x}")
+            mm[patch.offset : patch.offset + len(patch)] = patch.replacement
+        mm.flush()
+
+    # The mtime may not change if the file is patched twice in quick succession.
+    cache.forget(path)
+
+    return len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False,
+        description="Apply the binary patches listed in a manifest, e.g. to disable the C4786 warning in C2.EXE",
+    )
+    parser.add_argument("paths", type=pathlib.Path, nargs="+", help="Files to patch")
+    parser.add_argument(
+        "--manifest",
+        type=pathlib.Path,
+        default=DEFAULT_MANIFEST,
+        help="Patch manifest (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-f",
+        dest="force",
+        default=False,
+        action="store_true",
+        help="Patch even if the file size or checksum does not match",
+    )
+    parser.add_argument(
+        "--cache",
+        type=pathlib.Path,
+        default=DEFAULT_CACHE_PATH,
+        help="Digest cache file shared with verify_binaries.py (default: %(default)s)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Rehash every file")
+    args = parser.parse_args()
+
+    try:
+        targets = load_manifest(args.manifest)
+    except (OSError, KeyError, ValueError, yaml.YAMLError) as e:
+        parser.error(f"Invalid manifest '{args.manifest}': {e}")
+
+    cache = HashCache(None if args.no_cache else args.cache)
+    failed = 0
+    for path in args.paths:
+        target = targets.get(path.name.upper())
+        try:
+            if not path.is_file():
+                raise PatchError("input is not a file")
+            if target is None:
+                raise PatchError("no patches for this file in the manifest")
+
+            print(f"{path}: {target.description}")
+            count = patch_file(path, target, cache, args.force)
+            print("done" if count else "already patched")
+        except PatchError as e:
+            print(f"{path}: {e}")
+            failed += 1
+
+    cache.save()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+import io
+import json
+import sys
+
+import pytest
+
+import aggregate_progress
+from aggregate_progress import Aggregator, JsonStream, diff_aggregate
+
+
+def report(data, filename="LEGO1.DLL"):
+    return {"file": filename, "format": 1, "timestamp": 1.5, "data": data, "function_count": 3}
+
+
+def entity(addr, matching, **kwargs):
+    return {"address": hex(addr), "name": f"Function{addr:x}", "matching": matching, **kwargs}
+
+
+def write_json(path, obj):
+    path.write_text(json.dumps(obj))
+    return path
+
+
+def read_stream(text, chunk_size):
+    stream = JsonStream(io.StringIO(text), chunk_size)
+    out = {}
+    for key in stream.members():
+        out[key] = list(stream.elements()) if key == "data" else stream.value()
+    return out
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 64 * 1024])
+def test_stream_chunk_boundaries(chunk_size):
+    doc = report([entity(0x1000, 0.0, x=-1.25e-3), entity(0x1010, 1, stub=True, recomp=None)])
+    for text in (json.dumps(doc), json.dumps(doc, indent=2)):
+        assert read_stream(text, chunk_size) == doc
+
+
+def test_aggregate_best_match(tmp_path):
+    a = write_json(tmp_path / "a.json", report([entity(0x1000, 0.5), entity(0x1010, 0.0)]))
+    b = write_json(tmp_path / "b.json", report([entity(0x1000, 0.75), entity(0x1010, 0.0)]))
+
+    agg = Aggregator()
+    agg.add_sample(a)
+    agg.add_sample(b)
+
+    assert agg.best(0x1000) == 0.75
+    assert agg.best(0x1010) == 0.0
+    assert agg.contributions() == {str(a): 1, str(b): 1}
+
+
+def test_aggregate_roundtrip(tmp_path):
+    """An aggregate can be read back as a sample and as the base of a diff,
+    including functions with a score of zero."""
+    a = write_json(tmp_path / "a.json", report([entity(0x1000, 0.5), entity(0x1010, 0.0)]))
+    b = write_json(tmp_path / "b.json", report([entity(0x1000, 0.25), entity(0x1010, 0.0)]))
+
+    agg = Aggregator()
+    agg.add_sample(a)
+    agg.add_sample(b)
+
+    out = tmp_path / "agg.json"
+    with out.open("w", encoding="utf-8") as f:
+        agg.write(f, 0.0)
+
+    data = json.loads(out.read_text())["data"]
+    assert all("matching" in e for e in data)
+
+    again = Aggregator()
+    again.add_sample(out)
+    assert again.best(0x1010) == 0.0
+
+    assert diff_aggregate(again, out) == ([], [], [], [])
+
+    # Compare a newer aggregate with an added, a removed and an improved function
+    c = write_json(tmp_path / "c.json", report([entity(0x1000, 0.75), entity(0x1020, 0.5)]))
+    newer = Aggregator()
+    newer.add_sample(c)
+
+    improved, regressed, new_functions, missing = diff_aggregate(newer, out)
+    assert improved == [(0x1000, "Function1000", 0.5, 0.75)]
+    assert regressed == []
+    assert new_functions == [(0x1020, "Function1020", 0.5)]
+    assert missing == [(0x1010, "Function1010")]
+
+
+def test_aggregate_rejects_other_source(tmp_path):
+    agg = Aggregator()
+    agg.add_sample(write_json(tmp_path / "a.json", report([entity(0x1000, 0.5)])))
+
+    with pytest.raises(ValueError):
+        agg.add_sample(write_json(tmp_path / "b.json", report([], filename="ISLE.EXE")))
+
+
+def truncated(path, obj):
+    """Write the report cut off after its first entity."""
+    text = json.dumps(obj)
+    path.write_text(text[: text.index("}, {") + 1])
+    return path
+
+
+def test_aggregate_truncated_sample(tmp_path):
+    a = write_json(tmp_path / "a.json", report([entity(0x1000, 0.5), entity(0x1010, 0.25)]))
+    b = truncated(tmp_path / "b.json", report([entity(0x1000, 0.9), entity(0x1010, 0.9)]))
+
+    for order in ((a, b), (b, a)):
+        agg = Aggregator()
+        for path in order:
+            try:
+                agg.add_sample(path)
+            except ValueError:
+                pass
+
+        # Nothing from the broken sample is kept
+        assert agg.samples == [str(a)]
+        assert agg.best(0x1000) == 0.5
+        assert agg.contributions() == {str(a): 2}
+
+
+def test_main_skipped_sample(tmp_path, monkeypatch, capsys):
+    a = write_json(tmp_path / "a.json", report([entity(0x1000, 0.5), entity(0x1010, 0.25)]))
+    b = truncated(tmp_path / "b.json", report([entity(0x1000, 0.9), entity(0x1010, 0.9)]))
+    out = tmp_path / "agg.json"
+
+    argv = ["aggregate_progress.py", "--samples", str(b), str(a), "--contributions", "5", "-o", str(out)]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    assert aggregate_progress.main() == 1
+    assert "Skipping" in capsys.readouterr().err
+    assert [e["matching"] for e in json.loads(out.read_text())["data"]] == [0.5, 0.25]
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+import entropy
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["entropy.py", *argv])
+    return entropy.main()
+
+
+def test_unknown_vary_target(tmp_path, monkeypatch):
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, "5", "--output-dir", str(tmp_path), "--vary", "lego")
+    assert e.value.code == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_vary_only_rewrites_varied_headers(tmp_path, monkeypatch, capsys):
+    run(monkeypatch, "5", "--output-dir", str(tmp_path), "--vary", "LEGO1")
+    isle = (tmp_path / "entropy_isle.h").read_text()
+    lego1 = (tmp_path / "entropy_lego1.h").read_text()
+    capsys.readouterr()
+
+    run(monkeypatch, "6", "--output-dir", str(tmp_path), "--vary", "LEGO1")
+    out = capsys.readouterr().out
+
+    assert (tmp_path / "entropy_isle.h").read_text() == isle
+    assert (tmp_path / "entropy_lego1.h").read_text() != lego1
+    assert "entropy_isle.h               unchanged" in out
+    assert "entropy_lego1.h              changed" in out
+
+
+def test_invalidated_counts_shared_sources(tmp_path, monkeypatch, capsys):
+    cmakelists = tmp_path / "CMakeLists.txt"
+    cmakelists.write_text(
+        "add_library(omni${ARG_SUFFIX} STATIC\n  LEGO1/omni/a.cpp\n  LEGO1/shared.cpp\n)\n"
+        "add_executable(config WIN32\n  LEGO1/shared.cpp\n  CONFIG/config.cpp\n  CONFIG/res/config.rc\n)\n"
+    )
+    output_dir = tmp_path / "entropy"
+    argv = ["--output-dir", str(output_dir), "--cmakelists", str(cmakelists), "--vary", "LEGO1"]
+
+    run(monkeypatch, "5", *argv)
+    assert "Invalidated 4 of 4 translation units" in capsys.readouterr().out
+
+    # CONFIG compiles LEGO1/shared.cpp as well, so its copy depends on entropy_omni.h too
+    run(monkeypatch, "6", *argv)
+    out = capsys.readouterr().out
+    assert "entropy_config.h             unchanged     2 translation units" in out
+    assert "Invalidated 3 of 4 translation units" in out
+
+
+def test_vary_library_requires_libraries(tmp_path, monkeypatch, capsys):
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, "5", "--output-dir", str(tmp_path), "--vary", "omni")
+    assert e.value.code == 2
+    assert "requires --libraries" in capsys.readouterr().err
+    assert not list(tmp_path.iterdir())
+
+    run(monkeypatch, "5", "--output-dir", str(tmp_path), "--libraries", "--vary", "omni")
+    run(monkeypatch, "6", "--output-dir", str(tmp_path), "--libraries", "--vary", "omni")
+    out = capsys.readouterr().out
+    assert "entropy_omni.h               changed" in out
+    assert "entropy_lego1.h              unchanged" in out
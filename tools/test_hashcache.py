@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+import pytest
+
+from hashcache import HashCache
+
+SHA256 = hashlib.sha256(b"original").hexdigest()
+
+
+@pytest.fixture(name="binary")
+def fixture_binary(tmp_path):
+    path = tmp_path / "LEGO1.DLL"
+    path.write_bytes(b"original")
+    return path
+
+
+def test_digest_is_cached(binary, tmp_path):
+    cache = HashCache(tmp_path / "hashes.json")
+    assert cache.lookup(binary, "sha256") is None
+    assert cache.digest(binary, "sha256") == SHA256
+    assert cache.lookup(binary, "sha256") == SHA256
+    assert cache.lookup(binary, "md5") is None
+
+
+def test_miss_after_size_change(binary, tmp_path):
+    cache = HashCache(tmp_path / "hashes.json")
+    cache.digest(binary, "sha256")
+
+    st = binary.stat()
+    binary.write_bytes(b"patched!!")
+    os.utime(binary, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert cache.lookup(binary, "sha256") is None
+    assert cache.digest(binary, "sha256") == hashlib.sha256(b"patched!!").hexdigest()
+
+
+def test_miss_after_mtime_change(binary, tmp_path):
+    cache = HashCache(tmp_path / "hashes.json")
+    cache.digest(binary, "sha256")
+
+    # Same size, only the modification time tells the files apart
+    st = binary.stat()
+    binary.write_bytes(b"patched!")
+    os.utime(binary, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert cache.lookup(binary, "sha256") is None
+    assert cache.digest(binary, "sha256") == hashlib.sha256(b"patched!").hexdigest()
+
+
+def test_miss_after_replace(binary, tmp_path):
+    cache = HashCache(tmp_path / "hashes.json")
+    cache.digest(binary, "sha256")
+
+    # A new file of the same size and mtime moved into place
+    st = binary.stat()
+    other = tmp_path / "other"
+    other.write_bytes(b"patched!")
+    os.utime(other, ns=(st.st_atime_ns, st.st_mtime_ns))
+    keep = tmp_path / "keep"
+    binary.rename(keep)  # Keep the old inode from being reused
+    other.replace(binary)
+    assert binary.stat().st_ino != st.st_ino
+
+    assert cache.lookup(binary, "sha256") is None
+
+
+def test_reload(binary, tmp_path):
+    cache = HashCache(tmp_path / "cache" / "hashes.json")
+    cache.digest(binary, "sha256")
+    cache.save()
+
+    again = HashCache(tmp_path / "cache" / "hashes.json")
+    assert again.lookup(binary, "sha256") == SHA256
+
+    again.forget(binary)
+    again.save()
+    assert HashCache(tmp_path / "cache" / "hashes.json").lookup(binary, "sha256") is None
+
+
+@pytest.mark.parametrize("contents", ["", "{", "[]", '{"x": 1}', '{"/LEGO1.DLL": {"stat": 1}}'])
+def test_broken_cache_file(binary, tmp_path, contents):
+    path = tmp_path / "hashes.json"
+    path.write_text(contents.replace("/LEGO1.DLL", str(binary.resolve()).replace("\\", "\\\\")))
+
+    cache = HashCache(path)
+    assert cache.lookup(binary, "sha256") is None
+    assert cache.digest(binary, "sha256") == SHA256
+    cache.save()
+
+    assert HashCache(path).lookup(binary, "sha256") == SHA256
+
+
+def test_disabled(binary):
+    cache = HashCache(None)
+    assert cache.digest(binary, "sha256") == SHA256
+    cache.save()
@@ -0,0 +1,169 @@
+import hashlib
+import random
+import sys
+
+import pytest
+import yaml
+
+import patch_binaries
+from hashcache import HashCache
+from patch_binaries import DEFAULT_MANIFEST, PatchError, Target, load_manifest, patch_file
+
+C2 = load_manifest(DEFAULT_MANIFEST)["C2.EXE"]
+
+
+def make_binary(target: Target, size: int = None) -> bytes:
+    """Random contents of the target's size with the expected bytes at every patch offset."""
+    data = bytearray(random.Random(0).randbytes(size or target.size))
+    for patch in target.patches:
+        data[patch.offset : patch.offset + len(patch)] = patch.expected
+    return bytes(data)
+
+
+def apply(data: bytes, target: Target) -> bytes:
+    data = bytearray(data)
+    for patch in target.patches:
+        data[patch.offset : patch.offset + len(patch)] = patch.replacement
+    return bytes(data)
+
+
+def synthetic_target(original: bytes) -> Target:
+    """The C2.EXE patches, accepting the digests of the synthetic file."""
+    md5 = [hashlib.md5(original).hexdigest(), hashlib.md5(apply(original, C2)).hexdigest()]
+    return Target(
+        "C2.EXE",
+        {
+            "size": len(original),
+            "hash": {"md5": md5},
+            "patches": [
+                {"offset": p.offset, "expected": p.expected.hex(), "replacement": p.replacement.hex()}
+                for p in C2.patches
+            ],
+        },
+    )
+
+
+@pytest.fixture(name="c2")
+def fixture_c2(tmp_path):
+    path = tmp_path / "C2.EXE"
+    path.write_bytes(make_binary(C2))
+    return path
+
+
+def test_manifest():
+    assert C2.size == 549888
+    assert len(C2.patches) == 2
+    assert all(p.replacement == b"\x90" * 5 for p in C2.patches)
+
+
+def test_patch(c2):
+    original = c2.read_bytes()
+    target = synthetic_target(original)
+
+    assert patch_file(c2, target, HashCache(None)) == 2
+    assert c2.read_bytes() == apply(original, target)
+    assert (c2.parent / "C2.EXE.BAK").read_bytes() == original
+
+
+def test_patch_twice(c2):
+    target = synthetic_target(c2.read_bytes())
+    cache = HashCache(None)
+
+    patch_file(c2, target, cache)
+    patched = c2.read_bytes()
+    mtime = c2.stat().st_mtime_ns
+
+    assert patch_file(c2, target, cache) == 0
+    assert c2.read_bytes() == patched
+    assert c2.stat().st_mtime_ns == mtime
+
+
+def test_unexpected_bytes(c2):
+    data = bytearray(c2.read_bytes())
+    data[C2.patches[1].offset] = 0x00
+    c2.write_bytes(data)
+
+    with pytest.raises(PatchError, match="unexpected bytes"):
+        patch_file(c2, C2, HashCache(None), force=True)
+
+    # Nothing is written if any location does not match
+    assert c2.read_bytes() == data
+    assert not (c2.parent / "C2.EXE.BAK").exists()
+
+
+def test_checksum_mismatch(c2):
+    original = c2.read_bytes()
+
+    with pytest.raises(PatchError, match="md5 checksum"):
+        patch_file(c2, C2, HashCache(None))
+    assert c2.read_bytes() == original
+
+    assert patch_file(c2, C2, HashCache(None), force=True) == 2
+    assert c2.read_bytes() == apply(original, C2)
+
+
+def test_size_mismatch(tmp_path):
+    path = tmp_path / "C2.EXE"
+    original = make_binary(C2, C2.size + 16)
+    path.write_bytes(original)
+    target = synthetic_target(original)
+    target.size = C2.size
+
+    with pytest.raises(PatchError, match="file size"):
+        patch_file(path, target, HashCache(None))
+    assert path.read_bytes() == original
+
+    assert patch_file(path, target, HashCache(None), force=True) == 2
+
+
+def test_offset_past_end(tmp_path):
+    path = tmp_path / "C2.EXE"
+    path.write_bytes(make_binary(C2)[: C2.patches[1].offset + 2])
+
+    with pytest.raises(PatchError, match="past the end"):
+        patch_file(path, C2, HashCache(None), force=True)
+
+
+def test_cache_forgets_patched_file(c2, tmp_path):
+    target = synthetic_target(c2.read_bytes())
+    cache = HashCache(tmp_path / "hashes.json")
+
+    patch_file(c2, target, cache)
+    assert cache.lookup(c2, "md5") is None
+
+
+def test_main_patches_all_copies(tmp_path, monkeypatch, capsys):
+    original = make_binary(C2)
+    manifest = tmp_path / "patches.yml"
+    target = synthetic_target(original)
+    manifest.write_text(
+        yaml.safe_dump(
+            {
+                "targets": {
+                    "C2.EXE": {
+                        "size": target.size,
+                        "hash": {"md5": sorted(target.hashes["md5"])},
+                        "patches": [
+                            {"offset": p.offset, "expected": p.expected.hex(" "), "replacement": p.replacement.hex(" ")}
+                            for p in target.patches
+                        ],
+                    }
+                }
+            }
+        )
+    )
+
+    paths = []
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        paths.append(tmp_path / name / "c2.exe")
+        paths[-1].write_bytes(original)
+
+    argv = ["patch_binaries.py", "--manifest", str(manifest), "--no-cache", *map(str, paths)]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    assert patch_binaries.main() == 0
+    assert all(p.read_bytes() == apply(original, C2) for p in paths)
+
+    assert patch_binaries.main() == 0
+    assert capsys.readouterr().out.count("already patched") == 2
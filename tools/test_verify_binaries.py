@@ -0,0 +1,103 @@
+import hashlib
+import sys
+
+import pytest
+import yaml
+
+import verify_binaries
+
+
+@pytest.fixture(name="legobin")
+def fixture_legobin(tmp_path):
+    """ISLE.EXE matches, LEGO1.DLL does not and CONFIG.EXE is missing."""
+    legobin = tmp_path / "legobin"
+    legobin.mkdir()
+    (legobin / "ISLE.EXE").write_bytes(b"isle")
+    (legobin / "LEGO1.DLL").write_bytes(b"modified")
+
+    project = {
+        "targets": {
+            name: {"filename": filename, "hash": {"sha256": hashlib.sha256(contents).hexdigest()}}
+            for name, filename, contents in (
+                ("ISLE", "ISLE.EXE", b"isle"),
+                ("LEGO1", "LEGO1.DLL", b"lego1"),
+                ("CONFIG", "CONFIG.EXE", b"config"),
+            )
+        }
+    }
+    (tmp_path / "reccmp-project.yml").write_text(yaml.safe_dump(project, sort_keys=False))
+    return legobin
+
+
+def run(monkeypatch, capsys, legobin, *argv):
+    project = legobin.parent / "reccmp-project.yml"
+    cache = legobin.parent / "hashes.json"
+    argv = ["verify_binaries.py", str(legobin), "--project", str(project), "--cache", str(cache), *argv]
+    monkeypatch.setattr(sys, "argv", argv)
+    code = verify_binaries.main()
+    return code, capsys.readouterr().out.splitlines()
+
+
+def test_report(legobin, monkeypatch, capsys):
+    code, lines = run(monkeypatch, capsys, legobin)
+    assert code == 1
+    assert lines == [
+        "ISLE     ISLE.EXE     sha256 ok",
+        "LEGO1    LEGO1.DLL    sha256 MISMATCH",
+        "CONFIG   CONFIG.EXE   not found",
+    ]
+
+    code, lines = run(monkeypatch, capsys, legobin)
+    assert code == 1
+    assert lines[:2] == [
+        "ISLE     ISLE.EXE     sha256 ok (cached)",
+        "LEGO1    LEGO1.DLL    sha256 MISMATCH",
+    ]
+
+    # Fixing the file invalidates the cached digest
+    (legobin / "LEGO1.DLL").write_bytes(b"lego1")
+    code, lines = run(monkeypatch, capsys, legobin, "--targets", "ISLE", "LEGO1")
+    assert code == 0
+    assert lines == [
+        "ISLE     ISLE.EXE     sha256 ok (cached)",
+        "LEGO1    LEGO1.DLL    sha256 ok",
+    ]
+
+
+def test_no_cache(legobin, monkeypatch, capsys):
+    run(monkeypatch, capsys, legobin, "--no-cache")
+    assert not (legobin.parent / "hashes.json").exists()
+
+    _, lines = run(monkeypatch, capsys, legobin, "--no-cache")
+    assert lines[0] == "ISLE     ISLE.EXE     sha256 ok"
+
+
+@pytest.mark.parametrize(
+    "targets, code",
+    [
+        (["ISLE"], 0),
+        (["LEGO1"], 1),
+        # Missing files are only an error for targets asked for explicitly
+        (["CONFIG"], 1),
+    ],
+)
+def test_targets_exit_code(legobin, monkeypatch, capsys, targets, code):
+    assert run(monkeypatch, capsys, legobin, "--targets", *targets)[0] == code
+
+
+def test_unknown_target(legobin, monkeypatch, capsys):
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, capsys, legobin, "--targets", "LEGO2")
+    assert e.value.code == 2
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "x"])
+def test_invalid_jobs(legobin, monkeypatch, capsys, jobs):
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, capsys, legobin, "-j", jobs)
+    assert e.value.code == 2
+    assert "-j/--jobs" in capsys.readouterr().err
+
+
+def test_single_job(legobin, monkeypatch, capsys):
+    assert run(monkeypatch, capsys, legobin, "-j", "1", "--targets", "ISLE")[0] == 0
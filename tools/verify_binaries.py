@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+import argparse
+import concurrent.futures
+import os
+import pathlib
+
+import yaml
+
+from hashcache import DEFAULT_CACHE_PATH, HashCache, hash_file
+
+DEFAULT_PROJECT = pathlib.Path(__file__).parent.parent / "reccmp-project.yml"
+
+
+def load_targets(project: pathlib.Path) -> dict[str, dict]:
+    with project.open() as f:
+        return yaml.safe_load(f)["targets"]
+
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False,
+        description="Verify the original binaries against the hashes in reccmp-project.yml",
+    )
+    parser.add_argument(
+        "path",
+        type=pathlib.Path,
+        nargs="?",
+        default=pathlib.Path("legobin"),
+        help="Directory containing the original binaries (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--project",
+        type=pathlib.Path,
+        default=DEFAULT_PROJECT,
+        help="reccmp project file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        metavar="TARGET",
+        help="Only verify these targets. Missing files are an error for targets given here",
+    )
+    parser.add_argument(
+        "--cache",
+        type=pathlib.Path,
+        default=DEFAULT_CACHE_PATH,
+        help="Digest cache file (default: %(default)s)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Rehash every file")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="Number of files to hash in parallel",
+    )
+    args = parser.parse_args()
+
+    if not args.path.is_dir():
+        parser.error(f"'{args.path}' is not a directory")
+
+    targets = load_targets(args.project)
+    if args.targets:
+        unknown = [t for t in args.targets if t not in targets]
+        if unknown:
+            parser.error(f"Unknown targets: {', '.join(unknown)}")
+        targets = {name: targets[name] for name in args.targets}
+
+    cache = HashCache(None if args.no_cache else args.cache)
+
+    # (target, algorithm, expected digest) -> status
+    results: dict[tuple[str, str, str], str] = {}
+    pending: dict[concurrent.futures.Future, tuple] = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for name, target in targets.items():
+            path = args.path / target["filename"]
+            for algorithm, expected in target.get("hash", {}).items():
+                key = (name, algorithm, expected.lower())
+                if not path.is_file():
+                    results[key] = "missing"
+                    continue
+
+                digest = cache.lookup(path, algorithm)
+                if digest is not None:
+                    results[key] = "cached" if digest == key[2] else "mismatch"
+                    continue
+
+                # Placeholder to keep the report in project file order.
+                results[key] = "pending"
+                st = path.stat()
+                pending[pool.submit(hash_file, path, algorithm)] = (key, path, st)
+
+        for future in concurrent.futures.as_completed(pending):
+            key, path, st = pending[future]
+            digest = future.result()
+            cache.store(path, key[1], digest, st)
+            results[key] = "ok" if digest == key[2] else "mismatch"
+
+    cache.save()
+
+    failed = False
+    for (name, algorithm, _), status in results.items():
+        filename = targets[name]["filename"]
+        if status == "missing":
+            print(f"{name:<8} {filename:<12} not found")
+            failed |= bool(args.targets)
+        elif status == "mismatch":
+            print(f"{name:<8} {filename:<12} {algorithm} MISMATCH")
+            failed = True
+        else:
+            suffix = " (cached)" if status == "cached" else ""
+            print(f"{name:<8} {filename:<12} {algorithm} ok{suffix}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())